@@ -35,7 +35,7 @@ unsigned long last_send_time = 0;
 const long SEND_INTERVAL = 100; // ms
 
 void setup() {
-  Serial.begin(9600);
+  Serial.begin(115200);
   while (!Serial);
   Serial.println("--- Master w/ Var. Speed & Encoders Initialized ---");
   Wire.begin();
@@ -8,45 +8,136 @@ import queue
 import pygame
 import math
 import os
-import collections
+import re
+import numpy as np
+from dataclasses import dataclass, field
+from enum import IntEnum
 from tkinter import filedialog
 
 # --- Matplotlib for Graphing ---
 # Note: You may need to install this library: pip install matplotlib
-import matplotlib.pyplot as plt
+from matplotlib import colormaps
+from matplotlib.figure import Figure
+import matplotlib.animation as animation
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
-# --- PIDController Class ---
-class PIDController:
-    """A basic PID controller."""
-    def __init__(self, kp, ki, kd, output_limits=(-255, 255)):
-        self.kp, self.ki, self.kd = kp, ki, kd
-        self.output_limits = output_limits
-        self.setpoint = 0
-        self.last_error = 0
-        self.integral_error = 0
-        self.last_time = None
-
-    def set_setpoint(self, setpoint):
-        self.setpoint = setpoint
-        self.integral_error = 0
-        self.last_error = 0
-        self.last_time = None
-
-    def update(self, current_value):
-        current_time = time.time()
-        if self.last_time is None:
-            self.last_time = current_time
-            return 0
-        dt = current_time - self.last_time
-        if dt == 0: return 0
-        error = self.setpoint - current_value
-        self.integral_error += error * dt
-        derivative_error = (error - self.last_error) / dt
-        output = (self.kp * error) + (self.ki * self.integral_error) + (self.kd * derivative_error)
-        self.last_error = error
-        self.last_time = current_time
-        return max(self.output_limits[0], min(self.output_limits[1], output))
+# --- Numba for the PID Loop ---
+# Note: You may need to install this library: pip install numba
+from numba import njit
+
+# --- Encoder Frame Parsing ---
+# The master sends one ASCII frame per interval: "E1:<count>|E2:<count>|...|E6:<count>"
+_ENC_DTYPE = np.dtype('<i4')
+_ENC_RE = re.compile(rb'\|'.join(rb'E%d:(-?\d+)' % i for i in range(1, 7)))
+
+def _parse_encoder_line(line):
+    """Parses an encoder frame (bytes) into an array of the six counts, or returns None if malformed."""
+    if (m := _ENC_RE.fullmatch(line)) is None: return None
+    try: return np.fromiter(map(int, m.groups()), dtype=_ENC_DTYPE, count=6)
+    except (OverflowError, ValueError): return None # A corrupted count outside the int32 range
+
+# --- Widget Updates ---
+def _changed_options(widget, options):
+    """Returns the options (None values skipped) that differ from those last applied to widget, recording them."""
+    last = vars(widget).setdefault('_last_options', {})
+    changed = {key: value for key, value in options.items() if value is not None and last.get(key) != value}
+    last.update(changed)
+    return changed
+
+def _configure_changed(widget, **options):
+    """Configures widget with only the options that changed since they were last applied."""
+    if (changed := _changed_options(widget, options)): widget.configure(**changed)
+
+def _place_changed(widget, **options):
+    """Re-places widget with only the place options that changed since they were last applied."""
+    if (changed := _changed_options(widget, options)): widget.place(**changed)
+
+# --- Motor Commands ---
+# Commands are "<motor id>:<f|b|s>:<speed>\n"; ids 1-4 are master motors, 5-7 are slave motors
+_MOTOR_IDS = {'M1': '1', 'M2': '2', 'M3': '3', 'M4': '4', 'S1': '5', 'S2': '6', 'S3': '7'}
+_MOTOR_PREFIX = {motor: f"{motor_id}:" for motor, motor_id in _MOTOR_IDS.items()}
+
+def _fmt_cmd(motor, direction, speed):
+    """Builds the command string that drives motor in direction at speed."""
+    return f"{_MOTOR_PREFIX[motor]}{direction}:{speed}\n"
+
+_STOP_CMD = {motor: _fmt_cmd(motor, 's', 0) for motor in _MOTOR_IDS}
+
+# --- Controller Buttons ---
+class Btn(IntEnum):
+    """pygame button indices of the Xbox controller."""
+    A = 0; B = 1; X = 2; Y = 3; LB = 4; RB = 5; BACK = 6; L_STICK = 8; R_STICK = 9
+
+N_BUTTONS = 16 # Size of the per-button tables; covers every index pygame reports for the pad
+BTN_MAP = {btn.name: btn.value for btn in Btn}
+BTN_NAME_BY_ID = {i: name for name, i in BTN_MAP.items()}
+HAT_NAME_BY_VAL = {(0,1): 'DPAD_UP', (0,-1): 'DPAD_DOWN', (-1,0): 'DPAD_LEFT', (1,0): 'DPAD_RIGHT'}
+
+# --- PID Controllers ---
+# Motors under PID control, in encoder order (E1..E6)
+PID_MOTORS = ('M1', 'M2', 'M3', 'M4', 'S2', 'S3')
+PID_INDEX = {motor: i for i, motor in enumerate(PID_MOTORS)}
+PID_TARGET_THRESHOLD = 5 # Encoder counts from the target within which a held motor is left stopped
+REVERSED_MOTORS = frozenset({'S2', 'S3'}) # Motors driven forward ('f') by a positive PID output
+
+@njit(cache=True, fastmath=True)
+def pid_step(kp, ki, kd, setpoint, integral_error, last_error, primed, current, dt, deadband, out_lo, out_hi, out):
+    """Advances every PID controller by one step of length dt, writing the outputs into out."""
+    for i in range(kp.shape[0]):
+        if dt <= 0.0 or not primed[i]:
+            primed[i] = True # The first step after a reset only starts the clock
+            out[i] = 0.0
+            continue
+        error = setpoint[i] - current[i]
+        if abs(error) <= deadband:
+            last_error[i] = error # On target: output nothing and keep the integral from winding up
+            out[i] = 0.0
+            continue
+        integral_error[i] += error * dt
+        derivative_error = (error - last_error[i]) / dt
+        output = (kp[i] * error) + (ki[i] * integral_error[i]) + (kd[i] * derivative_error)
+        last_error[i] = error
+        out[i] = min(out_hi, max(out_lo, output))
+
+@dataclass
+class PIDBank:
+    """A bank of basic PID controllers, one per motor in PID_MOTORS, stored as parallel arrays."""
+    kp: np.ndarray
+    ki: np.ndarray
+    kd: np.ndarray
+    output_limits: tuple = (-255, 255)
+    deadband: float = 0.0
+    setpoint: np.ndarray = field(init=False)
+    integral_error: np.ndarray = field(init=False)
+    last_error: np.ndarray = field(init=False)
+    primed: np.ndarray = field(init=False)
+    output: np.ndarray = field(init=False)
+    last_time: float = None
+
+    def __post_init__(self):
+        self.kp, self.ki, self.kd = (np.asarray(g, dtype=np.float64) for g in (self.kp, self.ki, self.kd))
+        self.setpoint = np.zeros_like(self.kp)
+        self.integral_error = np.zeros_like(self.kp)
+        self.last_error = np.zeros_like(self.kp)
+        self.primed = np.zeros(self.kp.shape, dtype=np.bool_)
+        self.output = np.zeros_like(self.kp)
+
+    def set_setpoint(self, motor, setpoint):
+        i = PID_INDEX[motor]
+        self.setpoint[i] = setpoint
+        self.integral_error[i] = 0
+        self.last_error[i] = 0
+        self.primed[i] = False
+
+    def update(self, current_values, now):
+        """Steps all controllers against the encoder vector at time.perf_counter() time `now`."""
+        last_time, out = self.last_time, self.output
+        self.last_time = now
+        dt = 0.0 if last_time is None else now - last_time
+        out_lo, out_hi = self.output_limits
+        pid_step(self.kp, self.ki, self.kd, self.setpoint, self.integral_error, self.last_error, self.primed,
+                 current_values, dt, float(self.deadband), float(out_lo), float(out_hi), out)
+        return out
 
 # --- Graph Window Class ---
 class GraphWindow(ctk.CTkToplevel):
@@ -59,31 +150,51 @@ class GraphWindow(ctk.CTkToplevel):
         self.is_running = True
         self.data_points = 200 # Number of data points to show on the graph
 
-        # --- Data Storage ---
-        self.encoder_data = {f'E{i+1}': collections.deque(maxlen=self.data_points) for i in range(6)}
-        self.time_data = collections.deque(maxlen=self.data_points)
+        # --- Data Storage (ring buffer: one row per sample, one column per encoder) ---
+        # Every row is written twice, at i and i + data_points, so the window is always one contiguous slice
+        self._enc = np.zeros((2 * self.data_points, 6), dtype=np.float64)
+        self._t = np.zeros(2 * self.data_points, dtype=np.int64)
+        self._head = 0 # Row the next sample is written to
+        self._filled = 0 # Number of valid rows
         self.time_step = 0
 
         # --- Matplotlib Figure ---
-        self.fig, self.ax = plt.subplots()
+        self.fig = Figure()
+        self.ax = self.fig.add_subplot()
         self.ax.set_title("Encoder Values")
-        self.ax.set_xlabel("Time Steps")
+        self.ax.set_xlabel("Time Steps (0 = latest)")
         self.ax.set_ylabel("Encoder Reading")
 
+        # The newest sample is always drawn at x = 0, so the x-limits never change
+        self._x = np.arange(-self.data_points + 1, 1)
+        self.ax.set_xlim(-self.data_points + 1, 0)
+        self._ylo, self._yhi = -1.0, 1.0 # Only widened when the data leaves this range
+        self.ax.set_ylim(self._ylo, self._yhi)
+
         self.lines = {}
-        colors = plt.cm.get_cmap('viridis', 6)
+        colors = colormaps['viridis'].resampled(6)
         encoder_motor_map = {'E1': 'M1', 'E2': 'M2', 'E3': 'M3', 'E4': 'M4', 'E5': 'S2', 'E6': 'S3'}
         for i, (encoder, motor) in enumerate(encoder_motor_map.items()):
-            line, = self.ax.plot([], [], label=f'{encoder} ({motor})', color=colors(i))
+            line, = self.ax.plot([], [], label=f'{encoder} ({motor})', color=colors(i), animated=True)
             self.lines[encoder] = line
+        self._lines_tuple = tuple(self.lines[f'E{i+1}'] for i in range(6)) # Column order of the encoder buffer
         
-        self.ax.legend()
+        legend = self.ax.legend()
         self.ax.grid(True, which='both', linestyle='--', linewidth=0.5)
 
+        # --- Artists recolored by update_style ---
+        self._current_mode = None
+        self._themed_spines = list(self.ax.spines.values())
+        self._themed_texts = [self.ax.title, self.ax.xaxis.label, self.ax.yaxis.label, *legend.get_texts()]
+
         # --- Canvas to display the plot ---
         self.canvas = FigureCanvasTkAgg(self.fig, master=self)
         self.canvas.get_tk_widget().pack(side=ctk.TOP, fill=ctk.BOTH, expand=True)
 
+        # --- Animation (blitted; the axes are only fully redrawn when the limits move) ---
+        self._full_redraw = False # Set when the static background must be redrawn and re-cached
+        self.ani = animation.FuncAnimation(self.fig, self._animate, interval=250, blit=True, cache_frame_data=False)
+
         # --- Control Buttons Frame ---
         button_frame = ctk.CTkFrame(self, fg_color="transparent")
         button_frame.pack(pady=10)
@@ -95,12 +206,26 @@ class GraphWindow(ctk.CTkToplevel):
         self.export_button.pack(side="left", padx=10)
 
         self.protocol("WM_DELETE_WINDOW", self.on_closing)
+        self.bind("<Map>", self._on_map)
+        self.bind("<Unmap>", self._on_unmap)
         self.update_style(ctk.get_appearance_mode().lower()) # Set initial theme
-        self.update_graph()
 
     def toggle_run(self):
         self.is_running = not self.is_running
         self.toggle_button.configure(text="Pause" if self.is_running else "Resume")
+        # Pausing un-animates the lines so redraws (e.g. a theme change) still show them
+        if self.is_running: self._full_redraw = True; self.ani.resume()
+        else: self.ani.pause()
+
+    def _on_map(self, event):
+        # Child widgets report <Map>/<Unmap> through the toplevel's bindings too; only react to the window itself
+        if event.widget is self and self.is_running:
+            self._full_redraw = True
+            self.ani.event_source.start()
+
+    def _on_unmap(self, event):
+        if event.widget is self: # Minimized or withdrawn: nothing is visible, so stop the animation timer
+            self.ani.event_source.stop()
 
     def export_data(self):
         """Exports the current graph data to a CSV file."""
@@ -110,54 +235,68 @@ class GraphWindow(ctk.CTkToplevel):
             title="Save Encoder Data"
         )
         if not filepath:
-            self.master.gui_queue.put(("log_event", "Data export cancelled."))
+            self.master.post_gui_message("log_event", "Data export cancelled.")
             return
 
         try:
-            with open(filepath, 'w', newline='') as f:
-                header = "Time," + ",".join([f"E{i+1}" for i in range(6)]) + "\n"
-                f.write(header)
-                
-                # Ensure all data lists are of the same length
-                num_points = len(self.time_data)
-                data_rows = [list(self.time_data)]
-                for i in range(6):
-                    data_rows.append(list(self.encoder_data[f'E{i+1}']))
-
-                # Transpose data to write rows
-                transposed_data = zip(*data_rows)
-                
-                for row in transposed_data:
-                    f.write(','.join(map(str, row)) + '\n')
+            # One column per series, formatted and written in a single call
+            rows = np.column_stack((self._window(self._t), self._window(self._enc).astype(np.int64)))
+            header = "Time," + ",".join([f"E{i+1}" for i in range(6)])
+            np.savetxt(filepath, rows, fmt='%d', delimiter=',', header=header, comments='')
             
-            self.master.gui_queue.put(("log_event", f"Graph data successfully exported to {os.path.basename(filepath)}"))
+            self.master.post_gui_message("log_event", f"Graph data successfully exported to {os.path.basename(filepath)}")
         except Exception as e:
-            self.master.gui_queue.put(("log_event", f"Error exporting data: {e}"))
+            self.master.post_gui_message("log_event", f"Error exporting data: {e}")
 
 
     def update_data(self, new_data):
         if not self.is_running:
             return
             
-        self.time_data.append(self.time_step)
+        i = self._head
+        self._enc[i] = self._enc[i + self.data_points] = new_data
+        self._t[i] = self._t[i + self.data_points] = self.time_step
+        self._head = (i + 1) % self.data_points
+        self._filled = min(self._filled + 1, self.data_points)
         self.time_step += 1
-        
-        for i in range(6):
-            key = f'E{i+1}'
-            self.encoder_data[key].append(new_data[i])
 
-    def update_graph(self):
-        if self.is_running:
-            for encoder, line in self.lines.items():
-                line.set_data(self.time_data, self.encoder_data[encoder])
-            
-            self.ax.relim()
-            self.ax.autoscale_view()
+    def _window(self, arr):
+        """Returns a view of the valid rows of a ring buffer array, oldest first."""
+        start = self._head if self._filled == self.data_points else 0
+        return arr[start:start + self._filled]
+
+    def _widen_ylim(self, values):
+        """Widens the y-limits (with a 5% margin) if the values fall outside them; returns True if they changed."""
+        lo, hi = values.min(), values.max()
+        if lo >= self._ylo and hi <= self._yhi:
+            return False
+        lo, hi = min(lo, self._ylo), max(hi, self._yhi)
+        margin = 0.05 * (hi - lo)
+        self._ylo, self._yhi = lo - margin, hi + margin
+        self.ax.set_ylim(self._ylo, self._yhi)
+        return True
+
+    def _animate(self, frame):
+        x, values = self._x[self.data_points - self._filled:], self._window(self._enc)
+        lines = self._lines_tuple
+        for i in range(6): lines[i].set_data(x, values[:, i])
+
+        # Rescaling or restyling changes the static background, so redraw it and drop the stale blit cache;
+        # FuncAnimation re-caches the background from the fresh draw once this frame's lines are blitted
+        if self._filled and self._widen_ylim(values):
+            self._full_redraw = True
+        if self._full_redraw:
+            self._full_redraw = False
             self.canvas.draw()
-        
-        self.after(250, self.update_graph) # Update graph every 250ms
+            # Private matplotlib state: Animation._blit_draw keeps one {axes: (view, background)} entry per axes and
+            # only re-copies the background for an axes missing from it; Animation._on_resize clears it the same way
+            self.ani._blit_cache.clear()
+        return lines
 
     def update_style(self, mode):
+        if mode == self._current_mode:
+            return
+        self._current_mode = mode
         is_dark = mode == "dark"
         
         # Set background colors
@@ -166,19 +305,14 @@ class GraphWindow(ctk.CTkToplevel):
         
         # Set text/element colors
         text_color = "white" if is_dark else "black"
-        self.ax.title.set_color(text_color)
-        self.ax.xaxis.label.set_color(text_color)
-        self.ax.yaxis.label.set_color(text_color)
-        self.ax.tick_params(axis='x', colors=text_color)
-        self.ax.tick_params(axis='y', colors=text_color)
-        for spine in self.ax.spines.values():
+        self.ax.tick_params(axis='both', colors=text_color)
+        for spine in self._themed_spines:
             spine.set_edgecolor(text_color)
-
-        if self.ax.get_legend() is not None:
-            for text in self.ax.get_legend().get_texts():
-                text.set_color(text_color)
+        for text in self._themed_texts:
+            text.set_color(text_color)
         
-        self.canvas.draw()
+        self._full_redraw = True
+        self.canvas.draw_idle()
 
     def on_closing(self):
         self.master.graph_window = None # Inform the main app that the window is closed
@@ -187,6 +321,27 @@ class GraphWindow(ctk.CTkToplevel):
 
 class App(ctk.CTk):
     """GUI to control the robotic arm with an Xbox controller and view feedback."""
+
+    # --- Shared Colors ---
+    C_NORMAL = "gray30"
+    C_PRESSED = "#3399FF"
+    C_STICK_BG = "gray20"
+    C_OK = "#4CAF50"
+    C_WARN = "orange"
+    C_FACE_NORMAL = {'A': "#388E3C", 'B': "#D32F2F", 'X': "#1976D2", 'Y': "#FBC02D"}
+    C_FACE_PRESSED = {'A': "#66BB6A", 'B': "#E57373", 'X': "#42A5F5", 'Y': "#FFEE58"}
+
+    _font_cache = {}
+
+    @classmethod
+    def _font(cls, **kwargs):
+        """Returns a shared CTkFont for the given options, creating it on first use."""
+        key = tuple(sorted(kwargs.items()))
+        font = cls._font_cache.get(key)
+        if font is None:
+            font = cls._font_cache[key] = ctk.CTkFont(**kwargs)
+        return font
+
     def __init__(self):
         super().__init__()
 
@@ -202,29 +357,43 @@ class App(ctk.CTk):
         self.joystick = None
         self.controller_thread = None
         self.serial_reader_thread = None
+        self.serial_writer_thread = None
         self.stop_threads = threading.Event()
         self.gui_queue = queue.Queue()
+        self._tx_q = queue.SimpleQueue() # Outgoing command bytes for write_to_serial; None stops the writer
         self.encoder_labels = {}
+        self._pending_enc = None # Latest encoder frame not yet shown
+        self._enc_scheduled = False
         self.controller_widgets = {} # To hold interactive controller widgets
         self.graph_window = None # To hold the graph window instance
 
         # --- PID Controllers & State ---
-        self.pid_controllers = {
-            'M1': PIDController(0.60, 0.005, 0.0001), 'M2': PIDController(0.8, 0.005, 0.1),
-            'M3': PIDController(0.5, 0.005, 0.1), 'M4': PIDController(0.8, 0.005, 0.1),
-            'S2': PIDController(0.80, 0.005, 0.1), 'S3': PIDController(0.95, 0.005, 0.01)
-        }
-        self.pid_states = {motor: {'enabled': False, 'target': 0} for motor in self.pid_controllers}
-        self.current_encoders = {'M1': 0, 'M2': 0, 'M3': 0, 'M4': 0, 'S2': 0, 'S3': 0}
+        #                         M1      M2     M3     M4     S2     S3
+        self.pid_bank = PIDBank(kp=[0.60,   0.8,   0.5,   0.8,   0.80,  0.95],
+                                ki=[0.005,  0.005, 0.005, 0.005, 0.005, 0.005],
+                                kd=[0.0001, 0.1,   0.1,   0.1,   0.1,   0.01],
+                                deadband=PID_TARGET_THRESHOLD)
+        self.pid_states = {motor: {'enabled': False, 'target': 0} for motor in PID_MOTORS}
+        self._enabled_pids = set() # Motors whose PID is enabled; changed only through _set_pid_enabled
+        self.current_encoders = np.zeros(len(PID_MOTORS), dtype=np.float64) # Indexed like PID_MOTORS
 
         # --- Debounce Timers ---
-        self.last_press_times = {
-            'dpad_down': 0, 'dpad_up': 0, 'dpad_right': 0, 'dpad_left': 0,
-            'A': 0, 'B': 0, 'X': 0, 'Y': 0,
-            'L_STICK': 0, 'R_STICK': 0, 'BACK': 0, 'LB': 0, 'RB': 0
-        }
+        self._last_press = np.full(N_BUTTONS, -np.inf) # time.perf_counter() of each button's last accepted press
         self.DPAD_DEBOUNCE_DELAY = 0.5
         self.BUTTON_DEBOUNCE_DELAY = 0.3
+
+        # --- Button Actions (indexed by pygame button number: (debounce delay, action) or None) ---
+        button_actions = {
+            Btn.Y: (self.BUTTON_DEBOUNCE_DELAY, lambda: self._toggle_save_pos_pid('M2')),
+            Btn.B: (self.BUTTON_DEBOUNCE_DELAY, lambda: self._toggle_save_pos_pid('S3')),
+            Btn.X: (self.BUTTON_DEBOUNCE_DELAY, lambda: self._toggle_save_pos_pid('M3')),
+            Btn.A: (self.BUTTON_DEBOUNCE_DELAY, lambda: self._toggle_save_pos_pid('M1')),
+            Btn.R_STICK: (self.BUTTON_DEBOUNCE_DELAY, lambda: self._toggle_pid('M2', set_to_zero=True)),
+            Btn.L_STICK: (self.BUTTON_DEBOUNCE_DELAY, lambda: self._toggle_pid('M1', set_to_zero=True)),
+            Btn.BACK: (self.DPAD_DEBOUNCE_DELAY, self.toggle_all_pid_zero_mode),
+        }
+        self._button_actions = tuple(button_actions.get(i) for i in range(N_BUTTONS))
+        self._hat_actions = {(1,0): 'S2', (-1,0): 'M4', (0,1): 'S3', (0,-1): 'M3'} # D-pad direction -> motor whose hold-at-zero it toggles
         self._all_motors_zero_active = False
 
         # --- UI Construction ---
@@ -235,7 +404,7 @@ class App(ctk.CTk):
 
         # --- Pygame & Closing Protocol ---
         pygame.init()
-        self.after(100, self.process_gui_queue)
+        self.after(50, self.process_gui_queue)
         self.protocol("WM_DELETE_WINDOW", self.on_closing)
 
     def _create_widgets(self):
@@ -248,16 +417,12 @@ class App(ctk.CTk):
         map_frame = ctk.CTkFrame(self, fg_color="gray14")
         map_frame.grid(row=0, column=0, padx=20, pady=20, sticky="nsew")
 
-        title_label = ctk.CTkLabel(map_frame, text="Interactive Controller", font=ctk.CTkFont(size=20, weight="bold"))
+        title_label = ctk.CTkLabel(map_frame, text="Interactive Controller", font=self._font(size=20, weight="bold"))
         title_label.pack(pady=(10, 5))
 
         controller_canvas = ctk.CTkFrame(map_frame, fg_color="transparent")
         controller_canvas.pack(fill="both", expand=True, padx=20, pady=10)
 
-        self.C_NORMAL = "gray30"
-        self.C_PRESSED = "#3399FF"
-        self.C_STICK_BG = "gray20"
-
         self.controller_widgets['LB'] = ctk.CTkLabel(controller_canvas, text="LB", fg_color=self.C_NORMAL, corner_radius=6, width=80, height=30)
         self.controller_widgets['LB'].place(relx=0.15, rely=0.1, anchor="center")
         self.controller_widgets['RB'] = ctk.CTkLabel(controller_canvas, text="RB", fg_color=self.C_NORMAL, corner_radius=6, width=80, height=30)
@@ -303,14 +468,14 @@ class App(ctk.CTk):
 
     def _create_data_frame(self):
         """Creates the right, scrollable frame for all dynamic data."""
-        right_frame = ctk.CTkScrollableFrame(self, label_text="System Status & Control", label_font=ctk.CTkFont(size=16, weight="bold"))
+        right_frame = ctk.CTkScrollableFrame(self, label_text="System Status & Control", label_font=self._font(size=16, weight="bold"))
         right_frame.grid(row=0, column=1, padx=(0, 20), pady=20, sticky="nsew")
 
         # --- Action Display ---
         action_display_frame = ctk.CTkFrame(right_frame, fg_color="transparent")
         action_display_frame.pack(fill="x", padx=10, pady=(5, 10))
-        ctk.CTkLabel(action_display_frame, text="Last Action:", font=ctk.CTkFont(size=14, weight="bold")).pack(side="left")
-        self.action_display = ctk.CTkLabel(action_display_frame, text="---", font=ctk.CTkFont(size=32),
+        ctk.CTkLabel(action_display_frame, text="Last Action:", font=self._font(size=14, weight="bold")).pack(side="left")
+        self.action_display = ctk.CTkLabel(action_display_frame, text="---", font=self._font(size=32),
                                            fg_color="gray20", corner_radius=6, anchor="center", padx=10,
                                            text_color="#deffb3")
         self.action_display.pack(side="left", fill="x", expand=True, padx=(5,0))
@@ -326,7 +491,7 @@ class App(ctk.CTk):
         ctk.CTkButton(conn_frame, text="⟳", command=self._refresh_com_ports, width=30).pack(side="left", padx=5)
         self.connect_button = ctk.CTkButton(conn_frame, text="Connect", command=self.toggle_connection, width=100)
         self.connect_button.pack(side="left", padx=5)
-        self.status_label = ctk.CTkLabel(conn_frame, text="Disconnected", text_color="orange")
+        self.status_label = ctk.CTkLabel(conn_frame, text="Disconnected", text_color=self.C_WARN)
         self.status_label.pack(side="left", padx=10)
         
         # --- Theme and Graph Buttons ---
@@ -339,13 +504,13 @@ class App(ctk.CTk):
         live_status_frame = ctk.CTkFrame(right_frame)
         live_status_frame.pack(fill="x", padx=10, pady=10)
         live_status_frame.grid_columnconfigure((0, 1, 2, 3), weight=1)
-        ctk.CTkLabel(live_status_frame, text="Live Controller Status", font=ctk.CTkFont(size=14, weight="bold")).grid(row=0, column=0, columnspan=4, pady=(5,10))
-        self.controller_status_label = ctk.CTkLabel(live_status_frame, text="Controller Disconnected", text_color="orange", font=ctk.CTkFont(size=12))
+        ctk.CTkLabel(live_status_frame, text="Live Controller Status", font=self._font(size=14, weight="bold")).grid(row=0, column=0, columnspan=4, pady=(5,10))
+        self.controller_status_label = ctk.CTkLabel(live_status_frame, text="Controller Disconnected", text_color=self.C_WARN, font=self._font(size=12))
         self.controller_status_label.grid(row=1, column=0, columnspan=4, pady=(0, 10))
-        ctk.CTkLabel(live_status_frame, text="Control Axis", font=ctk.CTkFont(weight="bold", underline=True)).grid(row=2, column=0, padx=5)
-        ctk.CTkLabel(live_status_frame, text="Active Motor", font=ctk.CTkFont(weight="bold", underline=True)).grid(row=2, column=1, padx=5)
-        ctk.CTkLabel(live_status_frame, text="Speed", font=ctk.CTkFont(weight="bold", underline=True)).grid(row=2, column=2, padx=5)
-        ctk.CTkLabel(live_status_frame, text="Direction", font=ctk.CTkFont(weight="bold", underline=True)).grid(row=2, column=3, padx=5)
+        ctk.CTkLabel(live_status_frame, text="Control Axis", font=self._font(weight="bold", underline=True)).grid(row=2, column=0, padx=5)
+        ctk.CTkLabel(live_status_frame, text="Active Motor", font=self._font(weight="bold", underline=True)).grid(row=2, column=1, padx=5)
+        ctk.CTkLabel(live_status_frame, text="Speed", font=self._font(weight="bold", underline=True)).grid(row=2, column=2, padx=5)
+        ctk.CTkLabel(live_status_frame, text="Direction", font=self._font(weight="bold", underline=True)).grid(row=2, column=3, padx=5)
         self.m1_speed_label = ctk.CTkLabel(live_status_frame, text="0"); self.m1_dir_label = ctk.CTkLabel(live_status_frame, text="STOP")
         self.m4s2_motor_label = ctk.CTkLabel(live_status_frame, text="---"); self.m4s2_speed_label = ctk.CTkLabel(live_status_frame, text="0")
         self.m2_speed_label = ctk.CTkLabel(live_status_frame, text="0"); self.m2_dir_label = ctk.CTkLabel(live_status_frame, text="STOP")
@@ -366,10 +531,10 @@ class App(ctk.CTk):
         # --- Encoder Feedback ---
         encoder_frame = ctk.CTkFrame(right_frame); encoder_frame.pack(fill="x", padx=10, pady=10)
         encoder_frame.grid_columnconfigure(tuple(range(6)), weight=1)
-        ctk.CTkLabel(encoder_frame, text="Encoder Feedback", font=ctk.CTkFont(size=14, weight="bold")).grid(row=0, column=0, columnspan=6, pady=5)
+        ctk.CTkLabel(encoder_frame, text="Encoder Feedback", font=self._font(size=14, weight="bold")).grid(row=0, column=0, columnspan=6, pady=5)
         for i in range(6):
             frame = ctk.CTkFrame(encoder_frame, fg_color="transparent"); frame.grid(row=1, column=i, padx=5, pady=5)
-            ctk.CTkLabel(frame, text=f"E{i+1}:", font=ctk.CTkFont(weight="bold")).pack()
+            ctk.CTkLabel(frame, text=f"E{i+1}:", font=self._font(weight="bold")).pack()
             self.encoder_labels[f"E{i+1}"] = ctk.CTkLabel(frame, text="0"); self.encoder_labels[f"E{i+1}"].pack()
         
         # --- PID Control Sections ---
@@ -384,18 +549,18 @@ class App(ctk.CTk):
             self._create_pid_panel(pid_frame, display_name, motor)
 
         # --- Event Log ---
-        ctk.CTkLabel(right_frame, text="Event Log", font=ctk.CTkFont(size=14, weight="bold")).pack(padx=10, pady=(5,5), anchor="w")
+        ctk.CTkLabel(right_frame, text="Event Log", font=self._font(size=14, weight="bold")).pack(padx=10, pady=(5,5), anchor="w")
         self.event_log_textbox = ctk.CTkTextbox(right_frame, state="disabled", height=150, wrap="word")
         self.event_log_textbox.pack(pady=(0, 10), padx=10, fill="x", expand=True)
 
     def _create_pid_panel(self, parent, display_name, motor_name):
         parent.grid_columnconfigure(1, weight=1)
-        ctk.CTkLabel(parent, text=display_name, font=ctk.CTkFont(size=12, weight="bold")).grid(row=0, column=0, columnspan=2, pady=5, padx=5)
+        ctk.CTkLabel(parent, text=display_name, font=self._font(size=12, weight="bold")).grid(row=0, column=0, columnspan=2, pady=5, padx=5)
         ctk.CTkLabel(parent, text="Status:").grid(row=1, column=0, padx=(5,0), pady=1, sticky="w")
-        status = ctk.CTkLabel(parent, text="DISABLED", text_color="orange"); status.grid(row=1, column=1, padx=5, pady=1, sticky="w")
+        status = ctk.CTkLabel(parent, text="DISABLED", text_color=self.C_WARN); status.grid(row=1, column=1, padx=5, pady=1, sticky="w")
         ctk.CTkLabel(parent, text="Target Pos:").grid(row=2, column=0, padx=(5,0), pady=1, sticky="w")
         target = ctk.CTkLabel(parent, text="0"); target.grid(row=2, column=1, padx=5, pady=1, sticky="w")
-        msg = ctk.CTkLabel(parent, text="PID Ready", text_color="gray", font=ctk.CTkFont(size=11), anchor="w"); msg.grid(row=3, column=0, columnspan=2, pady=5, padx=5, sticky="ew")
+        msg = ctk.CTkLabel(parent, text="PID Ready", text_color="gray", font=self._font(size=11), anchor="w"); msg.grid(row=3, column=0, columnspan=2, pady=5, padx=5, sticky="ew")
         self.pid_ui_widgets[motor_name] = {'status': status, 'target': target, 'message': msg}
 
     def open_graph_window(self):
@@ -416,9 +581,9 @@ class App(ctk.CTk):
         self.com_var.set(ports[0] if ports else "")
 
     def send_command(self, command: str):
-        if self.serial_port and self.serial_port.is_open:
-            try: self.serial_port.write(command.encode('utf-8'))
-            except serial.SerialException: self.disconnect()
+        # Once the writer has exited nothing drains the queue, so drop the command instead
+        if not self.stop_threads.is_set() and self.serial_port and self.serial_port.is_open and self.serial_writer_thread.is_alive():
+            self._tx_q.put(command.encode('ascii'))
 
     def toggle_connection(self):
         if self.serial_port and self.serial_port.is_open: self.disconnect()
@@ -426,264 +591,319 @@ class App(ctk.CTk):
 
     def connect(self):
         port = self.com_var.get()
-        if not port: self.gui_queue.put(("log_event", "No COM port selected.")); return
+        if not port: self.post_gui_message("log_event", "No COM port selected."); return
         try:
-            self.serial_port = serial.Serial(port, 9600, timeout=1)
+            self.serial_port = serial.Serial(port, 115200, timeout=0.05)
             time.sleep(2)
             self.connect_button.configure(text="Disconnect", fg_color="#D32F2F", hover_color="#E53935")
-            self.status_label.configure(text=f"Connected to {port}", text_color="#4CAF50")
+            self.status_label.configure(text=f"Connected to {port}", text_color=self.C_OK)
             self.stop_threads.clear()
+            self._tx_q = queue.SimpleQueue()
+            self.serial_writer_thread = threading.Thread(target=self.write_to_serial, daemon=True); self.serial_writer_thread.start()
             self.controller_thread = threading.Thread(target=self.controller_listener, daemon=True); self.controller_thread.start()
             self.serial_reader_thread = threading.Thread(target=self.read_from_serial, daemon=True); self.serial_reader_thread.start()
-            self.gui_queue.put(("log_event", f"Successfully connected to {port}."))
+            self.post_gui_message("log_event", f"Successfully connected to {port}.")
         except serial.SerialException as e:
-            self.status_label.configure(text="Error", text_color="orange")
+            self.status_label.configure(text="Error", text_color=self.C_WARN)
             self.serial_port = None
-            self.gui_queue.put(("log_event", f"Failed to connect: {e}"))
+            self.post_gui_message("log_event", f"Failed to connect: {e}")
 
-    def disconnect(self):
+    def _stop_workers(self):
+        """Signals all worker threads to stop and gives each a brief chance to exit."""
         self.stop_threads.set()
-        if self.controller_thread and self.controller_thread.is_alive(): self.controller_thread.join(timeout=1)
-        if self.serial_reader_thread and self.serial_reader_thread.is_alive(): self.serial_reader_thread.join(timeout=1)
+        try: self.serial_port.cancel_read() # Wake the reader out of a blocking read
+        except AttributeError: pass
+        self._tx_q.put(None)
+        for t in (self.controller_thread, self.serial_reader_thread, self.serial_writer_thread):
+            if t: t.join(timeout=0.1)
         if self.serial_port and self.serial_port.is_open: self.serial_port.close()
+
+    def disconnect(self):
+        self._stop_workers()
         self.serial_port = None
         self.connect_button.configure(text="Connect", fg_color=ctk.ThemeManager.theme["CTkButton"]["fg_color"], hover_color=ctk.ThemeManager.theme["CTkButton"]["hover_color"])
-        self.status_label.configure(text="Disconnected", text_color="orange")
-        self.controller_status_label.configure(text="Controller Disconnected", text_color="orange")
-        self.gui_queue.put(("log_event", "Disconnected from serial port."))
+        self.status_label.configure(text="Disconnected", text_color=self.C_WARN)
+        _configure_changed(self.controller_status_label, text="Controller Disconnected", text_color=self.C_WARN)
+        self.post_gui_message("log_event", "Disconnected from serial port.")
 
     def _update_pid_ui(self, motor_name):
+        """Stops a motor whose PID was just disabled and queues its panel update; called from the controller thread."""
         state = self.pid_states[motor_name]
+        if not state['enabled']: self.send_command(_STOP_CMD[motor_name])
+        self.post_gui_message("pid_ui", (motor_name, state['enabled'], state['target']))
+
+    def _show_pid_state(self, motor_name, enabled, target):
         widgets = self.pid_ui_widgets[motor_name]
-        if state['enabled']:
-            widgets['status'].configure(text="ENABLED", text_color="#4CAF50")
-            widgets['message'].configure(text=f"Holding at {state['target']}")
+        if enabled:
+            widgets['status'].configure(text="ENABLED", text_color=self.C_OK)
+            widgets['message'].configure(text=f"Holding at {target}")
         else:
-            widgets['status'].configure(text="DISABLED", text_color="orange")
+            widgets['status'].configure(text="DISABLED", text_color=self.C_WARN)
             widgets['message'].configure(text="Joystick Control")
-            self.send_command(f"{ {'M1':1,'M2':2,'M3':3,'M4':4,'S1':5,'S2':6,'S3':7}[motor_name] }:s:0\n")
-        widgets['target'].configure(text=str(state['target']))
+        widgets['target'].configure(text=str(target))
+
+    def _set_pid_enabled(self, motor_name, enabled):
+        self.pid_states[motor_name]['enabled'] = enabled
+        if enabled: self._enabled_pids.add(motor_name)
+        else: self._enabled_pids.discard(motor_name)
 
     def _toggle_pid(self, motor_name, set_to_zero=False):
         state = self.pid_states[motor_name]
-        state['enabled'] = not state['enabled']
+        self._set_pid_enabled(motor_name, not state['enabled'])
         if state['enabled']:
             if set_to_zero: state['target'] = 0
-            self.gui_queue.put(("log_event", f"PID for {motor_name} {'enabled, resetting to 0' if set_to_zero else 'toggled' }."))
-            self.pid_controllers[motor_name].set_setpoint(state['target'])
+            self.post_gui_message("log_event", f"PID for {motor_name} {'enabled, resetting to 0' if set_to_zero else 'toggled' }.")
+            self.pid_bank.set_setpoint(motor_name, state['target'])
         else:
-            self.gui_queue.put(("log_event", f"PID disabled for {motor_name}."))
+            self.post_gui_message("log_event", f"PID disabled for {motor_name}.")
         self._update_pid_ui(motor_name)
 
     def _toggle_save_pos_pid(self, motor_name):
         """Toggles PID control for a motor, saving the current position if enabling."""
         state = self.pid_states[motor_name]
         if state['enabled']:
-            state['enabled'] = False
-            self.gui_queue.put(("log_event", f"PID disabled for {motor_name} via face button."))
+            self._set_pid_enabled(motor_name, False)
+            self.post_gui_message("log_event", f"PID disabled for {motor_name} via face button.")
         else:
-            state['enabled'] = True
-            state['target'] = self.current_encoders[motor_name]
-            self.pid_controllers[motor_name].set_setpoint(state['target'])
-            self.gui_queue.put(("log_event", f"{motor_name} holding position {state['target']} via PID."))
+            self._set_pid_enabled(motor_name, True)
+            state['target'] = int(self.current_encoders[PID_INDEX[motor_name]])
+            self.pid_bank.set_setpoint(motor_name, state['target'])
+            self.post_gui_message("log_event", f"{motor_name} holding position {state['target']} via PID.")
         
         self._update_pid_ui(motor_name)
 
     def toggle_all_pid_zero_mode(self):
         self._all_motors_zero_active = not self._all_motors_zero_active
         action = "Resetting all motors to zero" if self._all_motors_zero_active else "Disabling all PIDs"
-        self.gui_queue.put(("log_event", f"BACK button: {action}."))
-        for motor in self.pid_controllers:
+        self.post_gui_message("log_event", f"BACK button: {action}.")
+        for motor in PID_MOTORS:
             state = self.pid_states[motor]
             should_be_enabled = self._all_motors_zero_active
             if state['enabled'] != should_be_enabled:
-                state['enabled'] = should_be_enabled
-                if should_be_enabled: state['target'] = 0; self.pid_controllers[motor].set_setpoint(0)
+                self._set_pid_enabled(motor, should_be_enabled)
+                if should_be_enabled: state['target'] = 0; self.pid_bank.set_setpoint(motor, 0)
                 self._update_pid_ui(motor)
 
     def controller_listener(self):
         pygame.joystick.init()
         if pygame.joystick.get_count() == 0:
-            self.gui_queue.put(("update_label", {'widget': self.controller_status_label, 'text': "No controller found!", 'color': "orange"}))
+            self.post_gui_message("update_label", {'widget': self.controller_status_label, 'text': "No controller found!", 'color': self.C_WARN})
             return
         self.joystick = pygame.joystick.Joystick(0); self.joystick.init()
-        self.gui_queue.put(("update_label", {'widget': self.controller_status_label, 'text': f"Connected: {self.joystick.get_name()}", 'color': "#4CAF50"}))
+        self._axes = [self.joystick.get_axis(i) for i in range(self.joystick.get_numaxes())] # Seeded at connect, then kept current from JOYAXISMOTION events
+        PIDBank(kp=[0.0], ki=[0.0], kd=[0.0]).update(np.zeros(1), 0.0) # Compile pid_step now, not on the first PID hold
+        self.post_gui_message("update_label", {'widget': self.controller_status_label, 'text': f"Connected: {self.joystick.get_name()}", 'color': self.C_OK})
 
-        JOYSTICK_DEADZONE, PID_TARGET_THRESHOLD = 0.15, 5
+        JOYSTICK_DEADZONE = 0.15
         AXIS_MAP = {'LX': 0, 'LY': 1, 'RX': 2, 'RY': 3}
-        BTN_MAP = {'A': 0, 'B': 1, 'X': 2, 'Y': 3, 'LB': 4, 'RB': 5, 'BACK': 6, 'L_STICK': 8, 'R_STICK': 9}
-        MOTOR_MAP = {'M1': 1, 'M2': 2, 'M3': 3, 'M4': 4, 'S1': 5, 'S2': 6, 'S3': 7}
+        S1_EXTEND, S1_RETRACT, S1_STOP = (_fmt_cmd('S1', 'f', 255), "EXTEND"), (_fmt_cmd('S1', 'b', 255), "RETRACT"), (_STOP_CMD['S1'], "STOP")
         ACTION_TEXT = {'LB': 'Extend Actuator (S1)', 'RB': 'Retract Actuator (S1)', 'A': 'Toggle Hold: End-Effector Up/Down (M1)',
                        'B': 'Toggle Hold: Lower Link Right (S3)', 'X': 'Toggle Hold: Lower Link Left (M3)', 'Y': 'Toggle Hold: Lower Link Up/Down (M2)',
                        'L_STICK': 'Reset End-Effector Up/Down (M1)', 'R_STICK': 'Reset Lower Link Up/Down (M2)', 'BACK': 'Global Reset ALL Motors',
                        'DPAD_UP': 'Reset Lower Link Right (S3)', 'DPAD_DOWN': 'Reset Lower Link Left (M3)',
                        'DPAD_LEFT': 'Reset End-Effector Left (M4)', 'DPAD_RIGHT': 'Reset End-Effector Right (S2)'}
-        last_commands = {motor: "" for motor in MOTOR_MAP}
+        last_commands = {motor: "" for motor in _MOTOR_IDS}
+
+        def drive_bend_pair(left, right, value, left_text, right_text, motor_label, speed_label):
+            """Drives one bend pair from a stick axis and returns its action text, or "" when centred."""
+            speed, motor_text, cmd, action = int(abs(value)*255), "---", "stop", ""
+            if value > JOYSTICK_DEADZONE: motor_text, cmd, action = right, _fmt_cmd(right, 'f', speed), right_text
+            elif value < -JOYSTICK_DEADZONE: motor_text, cmd, action = left, _fmt_cmd(left, 'f', speed), left_text
+            # Guard each motor of the pair on its own; the idle one is stopped before the driven one runs
+            for motor in ((right, left) if motor_text == left else (left, right)):
+                motor_cmd = cmd if motor == motor_text else _STOP_CMD[motor]
+                if motor_cmd != last_commands[motor]: send(motor_cmd); last_commands[motor] = motor_cmd
+            labels[motor_label] = (motor_text, None); labels[speed_label] = (str(speed if motor_text != "---" else 0), None)
+            return action
         
         while not self.stop_threads.is_set():
-            current_time = time.time()
+            tick_start = time.perf_counter()
+            # Sleep until input arrives; while a PID hold is active, still wake every tick so it keeps running.
+            # The idle timeout stays well inside _stop_workers' 100 ms join, and nothing below blocks on Tk
+            pid_active = bool(self._enabled_pids)
+            events = [pygame.event.wait(timeout=20 if pid_active else 50)]
+            if self.stop_threads.is_set(): break
+            if events[0].type == pygame.NOEVENT and not pid_active: continue
+            events += pygame.event.get()
+
+            now = time.perf_counter() # One monotonic timestamp for every debounce and PID step this tick
             action_to_show = ""
+            pending = {'labels': {}, 'colors': {}, 'places': {}} # This tick's widget updates, keyed by widget, sent as one batch
+            labels, colors = pending['labels'], pending['colors']
+            tx = []; send = tx.append # This tick's motor commands, queued for the writer as one block
 
-            for event in pygame.event.get():
+            for event in events:
                 if event.type == pygame.QUIT: self.stop_threads.set(); return
+                if event.type == pygame.JOYAXISMOTION and event.axis < len(self._axes): self._axes[event.axis] = event.value
                 
-                if event.type in [pygame.JOYBUTTONDOWN, pygame.JOYBUTTONUP]:
-                    for name, index in BTN_MAP.items():
-                        if event.button == index:
-                            is_down = event.type == pygame.JOYBUTTONDOWN
-                            if name in ['A', 'B', 'X', 'Y']:
-                                colors_normal = {'A': "#388E3C", 'B': "#D32F2F", 'X': "#1976D2", 'Y': "#FBC02D"}
-                                colors_pressed = {'A': "#66BB6A", 'B': "#E57373", 'X': "#42A5F5", 'Y': "#FFEE58"}
-                                color = colors_pressed[name] if is_down else colors_normal[name]
-                                self.gui_queue.put(("update_widget_color", {'widget': self.controller_widgets[name], 'color': color}))
-                            else:
-                                color = self.C_PRESSED if is_down else self.C_NORMAL
-                                widget_key = f"{name}_BTN" if "STICK" in name else name
-                                self.gui_queue.put(("update_widget_color", {'widget': self.controller_widgets[widget_key], 'color': color}))
+                name = BTN_NAME_BY_ID.get(event.button) if event.type in [pygame.JOYBUTTONDOWN, pygame.JOYBUTTONUP] else None
+                if name:
+                    is_down = event.type == pygame.JOYBUTTONDOWN
+                    if name in self.C_FACE_NORMAL:
+                        color = self.C_FACE_PRESSED[name] if is_down else self.C_FACE_NORMAL[name]
+                        colors[self.controller_widgets[name]] = color
+                    else:
+                        color = self.C_PRESSED if is_down else self.C_NORMAL
+                        widget_key = f"{name}_BTN" if "STICK" in name else name
+                        colors[self.controller_widgets[widget_key]] = color
                 
                 if event.type == pygame.JOYBUTTONDOWN:
-                    btn_name = next((name for name, i in BTN_MAP.items() if i == event.button), None)
-                    if btn_name: action_to_show = ACTION_TEXT.get(btn_name, "")
-
-                    if event.button == BTN_MAP['Y'] and current_time - self.last_press_times['Y'] > self.BUTTON_DEBOUNCE_DELAY:
-                        self.last_press_times['Y'] = current_time; self._toggle_save_pos_pid('M2')
-                    elif event.button == BTN_MAP['B'] and current_time - self.last_press_times['B'] > self.BUTTON_DEBOUNCE_DELAY:
-                        self.last_press_times['B'] = current_time; self._toggle_save_pos_pid('S3')
-                    elif event.button == BTN_MAP['X'] and current_time - self.last_press_times['X'] > self.BUTTON_DEBOUNCE_DELAY:
-                        self.last_press_times['X'] = current_time; self._toggle_save_pos_pid('M3')
-                    elif event.button == BTN_MAP['A'] and current_time - self.last_press_times['A'] > self.BUTTON_DEBOUNCE_DELAY:
-                        self.last_press_times['A'] = current_time; self._toggle_save_pos_pid('M1')
-                    elif event.button == BTN_MAP['R_STICK'] and current_time - self.last_press_times['R_STICK'] > self.BUTTON_DEBOUNCE_DELAY:
-                        self.last_press_times['R_STICK'] = current_time; self._toggle_pid('M2', set_to_zero=True)
-                    elif event.button == BTN_MAP['L_STICK'] and current_time - self.last_press_times['L_STICK'] > self.BUTTON_DEBOUNCE_DELAY:
-                        self.last_press_times['L_STICK'] = current_time; self._toggle_pid('M1', set_to_zero=True)
-                    elif event.button == BTN_MAP['BACK'] and current_time - self.last_press_times['BACK'] > self.DPAD_DEBOUNCE_DELAY:
-                        self.last_press_times['BACK'] = current_time; self.toggle_all_pid_zero_mode()
+                    if name: action_to_show = ACTION_TEXT.get(name, "")
+
+                    idx = event.button
+                    if idx < N_BUTTONS and (entry := self._button_actions[idx]):
+                        delay, action = entry
+                        if now - self._last_press[idx] > delay:
+                            self._last_press[idx] = now; action()
 
                 if event.type == pygame.JOYHATMOTION and event.hat == 0:
-                    hat_map = {(0,1): 'DPAD_UP', (0,-1): 'DPAD_DOWN', (-1,0): 'DPAD_LEFT', (1,0): 'DPAD_RIGHT'}
-                    for val, name in hat_map.items():
+                    for val, name in HAT_NAME_BY_VAL.items():
                         is_pressed = event.value == val
-                        self.gui_queue.put(("update_widget_color", {'widget': self.controller_widgets[name], 'color': self.C_PRESSED if is_pressed else self.C_NORMAL}))
+                        colors[self.controller_widgets[name]] = self.C_PRESSED if is_pressed else self.C_NORMAL
                         if is_pressed: action_to_show = ACTION_TEXT.get(name, "")
                     
-                    if event.value == (1, 0): self._toggle_pid('S2', set_to_zero=True)
-                    elif event.value == (-1, 0): self._toggle_pid('M4', set_to_zero=True)
-                    elif event.value == (0, 1): self._toggle_pid('S3', set_to_zero=True)
-                    elif event.value == (0, -1): self._toggle_pid('M3', set_to_zero=True)
-
-            for motor, state in self.pid_states.items():
-                if state['enabled']:
-                    pid_output = self.pid_controllers[motor].update(self.current_encoders[motor])
-                    
-                    if abs(state['target'] - self.current_encoders[motor]) > PID_TARGET_THRESHOLD:
-                        speed = int(min(abs(pid_output), 255))
-                        if motor == 'S2' or motor == 'S3':
-                            direction = 'f' if pid_output > 0 else 'b' # Reversed for S2 and S3
-                        else:
-                            direction = 'b' if pid_output > 0 else 'f' # Normal
+                    if (motor := self._hat_actions.get(event.value)): self._toggle_pid(motor, set_to_zero=True)
+
+            # The PID pass only runs while a hold is enabled; the loop below is empty otherwise
+            pid_outputs = self.pid_bank.update(self.current_encoders, now) if self._enabled_pids else None
+            for motor in self._enabled_pids:
+                pid_output = pid_outputs[PID_INDEX[motor]]
+                if pid_output: # Exactly zero within PID_TARGET_THRESHOLD of the target
+                    speed = int(min(abs(pid_output), 255))
+                    if motor in REVERSED_MOTORS:
+                        direction = 'f' if pid_output > 0 else 'b' # Reversed for S2 and S3
                     else:
-                        speed, direction = 0, 's'
+                        direction = 'b' if pid_output > 0 else 'f' # Normal
+                else:
+                    speed, direction = 0, 's'
 
-                    cmd = f"{MOTOR_MAP[motor]}:{direction}:{speed}\n"
-                    if cmd != last_commands.get(motor):
-                        self.send_command(cmd)
-                        last_commands[motor] = cmd
+                cmd = _fmt_cmd(motor, direction, speed)
+                if cmd != last_commands.get(motor):
+                    send(cmd)
+                    last_commands[motor] = cmd
 
-            lx, ly = self.joystick.get_axis(AXIS_MAP['LX']), -self.joystick.get_axis(AXIS_MAP['LY'])
-            rx, ry = self.joystick.get_axis(AXIS_MAP['RX']), -self.joystick.get_axis(AXIS_MAP['RY'])
-            self.gui_queue.put(("update_joystick_visual", {'widget': self.controller_widgets['L_STICK_VISUAL'], 'x': lx, 'y': ly}))
-            self.gui_queue.put(("update_joystick_visual", {'widget': self.controller_widgets['R_STICK_VISUAL'], 'x': rx, 'y': ry}))
+            axes = self._axes
+            lx, ly = axes[AXIS_MAP['LX']], -axes[AXIS_MAP['LY']]
+            rx, ry = axes[AXIS_MAP['RX']], -axes[AXIS_MAP['RY']]
+            pending['places'][self.controller_widgets['L_STICK_VISUAL']] = (lx, ly)
+            pending['places'][self.controller_widgets['R_STICK_VISUAL']] = (rx, ry)
 
             if not self.pid_states['M1']['enabled']:
                 speed, d_text = (int(abs(ly)*255), "UP" if ly > JOYSTICK_DEADZONE else "DOWN" if ly < -JOYSTICK_DEADZONE else "STOP")
                 direction = 'f' if ly > JOYSTICK_DEADZONE else 'b' if ly < -JOYSTICK_DEADZONE else 's'
-                cmd = f"{MOTOR_MAP['M1']}:{direction}:{speed}\n";
-                if cmd != last_commands['M1']: self.send_command(cmd); last_commands['M1'] = cmd
-                self.gui_queue.put(("update_label", {'widget': self.m1_speed_label, 'text': str(speed)})); self.gui_queue.put(("update_label", {'widget': self.m1_dir_label, 'text': d_text}))
+                cmd = _fmt_cmd('M1', direction, speed);
+                if cmd != last_commands['M1']: send(cmd); last_commands['M1'] = cmd
+                labels[self.m1_speed_label] = (str(speed), None); labels[self.m1_dir_label] = (d_text, None)
                 if abs(ly) > JOYSTICK_DEADZONE: action_to_show = f"End-Effector Up/Down: {d_text}"
 
             if not self.pid_states['M4']['enabled'] and not self.pid_states['S2']['enabled']:
-                speed, motor_text = int(abs(lx)*255), "---"
-                if lx > JOYSTICK_DEADZONE: motor_text, cmd = "S2", f"{MOTOR_MAP['S2']}:f:{speed}\n"; action_to_show = "End-Effector Bend Right"
-                elif lx < -JOYSTICK_DEADZONE: motor_text, cmd = "M4", f"{MOTOR_MAP['M4']}:f:{speed}\n"; action_to_show = "End-Effector Bend Left"
-                else: cmd = "stop"
-                if cmd == "stop" and (last_commands['M4']!="4:s:0\n" or last_commands['S2']!="6:s:0\n"): self.send_command("4:s:0\n"); self.send_command("6:s:0\n"); last_commands.update({'M4':"4:s:0\n", 'S2':"6:s:0\n"})
-                elif cmd != "stop" and cmd != last_commands.get(motor_text): self.send_command("4:s:0\n" if motor_text=="S2" else "6:s:0\n"); self.send_command(cmd); last_commands.update({motor_text: cmd, ('M4' if motor_text=='S2' else 'S2'): "4:s:0\n" if motor_text=='S2' else "6:s:0\n"})
-                self.gui_queue.put(("update_label", {'widget': self.m4s2_motor_label, 'text': motor_text})); self.gui_queue.put(("update_label", {'widget': self.m4s2_speed_label, 'text': str(speed if motor_text != "---" else 0)}))
+                action_to_show = drive_bend_pair('M4', 'S2', lx, "End-Effector Bend Left", "End-Effector Bend Right",
+                                                 self.m4s2_motor_label, self.m4s2_speed_label) or action_to_show
 
             if not self.pid_states['M2']['enabled']:
                 speed, d_text = (int(abs(ry)*255), "UP" if ry > JOYSTICK_DEADZONE else "DOWN" if ry < -JOYSTICK_DEADZONE else "STOP")
                 direction = 'f' if ry > JOYSTICK_DEADZONE else 'b' if ry < -JOYSTICK_DEADZONE else 's'
-                cmd = f"{MOTOR_MAP['M2']}:{direction}:{speed}\n";
-                if cmd != last_commands['M2']: self.send_command(cmd); last_commands['M2'] = cmd
-                self.gui_queue.put(("update_label", {'widget': self.m2_speed_label, 'text': str(speed)})); self.gui_queue.put(("update_label", {'widget': self.m2_dir_label, 'text': d_text}))
+                cmd = _fmt_cmd('M2', direction, speed);
+                if cmd != last_commands['M2']: send(cmd); last_commands['M2'] = cmd
+                labels[self.m2_speed_label] = (str(speed), None); labels[self.m2_dir_label] = (d_text, None)
                 if abs(ry) > JOYSTICK_DEADZONE: action_to_show = f"Lower Link Up/Down: {d_text}"
 
             if not self.pid_states['M3']['enabled'] and not self.pid_states['S3']['enabled']:
-                speed, motor_text = int(abs(rx)*255), "---"
-                if rx > JOYSTICK_DEADZONE: motor_text, cmd = "S3", f"{MOTOR_MAP['S3']}:f:{speed}\n"; action_to_show = "Lower Link Bend Right"
-                elif rx < -JOYSTICK_DEADZONE: motor_text, cmd = "M3", f"{MOTOR_MAP['M3']}:f:{speed}\n"; action_to_show = "Lower Link Bend Left"
-                else: cmd = "stop"
-                if cmd == "stop" and (last_commands['M3']!="3:s:0\n" or last_commands['S3']!="7:s:0\n"): self.send_command("3:s:0\n"); self.send_command("7:s:0\n"); last_commands.update({'M3':"3:s:0\n", 'S3':"7:s:0\n"})
-                elif cmd != "stop" and cmd != last_commands.get(motor_text): self.send_command("3:s:0\n" if motor_text=="S3" else "7:s:0\n"); self.send_command(cmd); last_commands.update({motor_text: cmd, ('M3' if motor_text=='S3' else 'S3'): "3:s:0\n" if motor_text=='S3' else "7:s:0\n"})
-                self.gui_queue.put(("update_label", {'widget': self.m3s3_motor_label, 'text': motor_text})); self.gui_queue.put(("update_label", {'widget': self.m3s3_speed_label, 'text': str(speed if motor_text != "---" else 0)}))
-
-            lb, rb = self.joystick.get_button(BTN_MAP['LB']), self.joystick.get_button(BTN_MAP['RB'])
-            cmd, d_text = (f"{MOTOR_MAP['S1']}:f:255\n", "EXTEND") if lb else (f"{MOTOR_MAP['S1']}:b:255\n", "RETRACT") if rb else (f"{MOTOR_MAP['S1']}:s:0\n", "STOP")
-            if cmd != last_commands['S1']: self.send_command(cmd); last_commands['S1'] = cmd; self.gui_queue.put(("update_label", {'widget': self.s1_dir_label, 'text': d_text}))
+                action_to_show = drive_bend_pair('M3', 'S3', rx, "Lower Link Bend Left", "Lower Link Bend Right",
+                                                 self.m3s3_motor_label, self.m3s3_speed_label) or action_to_show
+
+            lb, rb = self.joystick.get_button(Btn.LB), self.joystick.get_button(Btn.RB)
+            cmd, d_text = S1_EXTEND if lb else S1_RETRACT if rb else S1_STOP
+            if cmd != last_commands['S1']: send(cmd); last_commands['S1'] = cmd; labels[self.s1_dir_label] = (d_text, None)
             
-            if action_to_show: self.gui_queue.put(("update_label", {'widget': self.action_display, 'text': action_to_show}))
+            if self.stop_threads.is_set(): break # Shutting down: send and show nothing from this tick
+            if tx: self.send_command("".join(tx))
+            if action_to_show: labels[self.action_display] = (action_to_show, None)
+            self.post_gui_message("batch", pending)
 
-            time.sleep(0.02)
+            time.sleep(max(0.0, 0.02 - (time.perf_counter() - tick_start))) # Cap busy input at the old 50 Hz tick
 
     def read_from_serial(self):
+        """Reads everything waiting on the port in one call and splits it into encoder lines locally."""
+        buf = bytearray()
         while not self.stop_threads.is_set():
             if self.serial_port and self.serial_port.is_open:
                 try:
-                    line = self.serial_port.readline().decode('utf-8').strip()
-                    if line.startswith("E1:"): self.gui_queue.put(("update_encoders", line))
-                except (serial.SerialException, UnicodeDecodeError) as e:
-                    self.gui_queue.put(("log_event", f"Serial read error: {e}")); break
+                    buf += self.serial_port.read(max(1, self.serial_port.in_waiting))
+                    while (nl := buf.find(b'\n')) != -1:
+                        line = bytes(buf[:nl]).strip(); del buf[:nl + 1]
+                        if line.startswith(b"E1:") and (values := _parse_encoder_line(line)) is not None:
+                            self.post_gui_message("update_encoders", values)
+                # in_waiting is a raw ioctl on POSIX: OSError on unplug/hang-up, TypeError once the port is closed
+                except (serial.SerialException, OSError, TypeError) as e:
+                    if not self.stop_threads.is_set(): self.post_gui_message("serial_error", f"Serial read error: {e}")
+                    break
             else: time.sleep(0.1)
 
+    def write_to_serial(self):
+        """Writes queued commands to the port, draining everything pending into a single write."""
+        item = b""
+        while item is not None:
+            buf = bytearray()
+            item = self._tx_q.get()
+            while item is not None:
+                buf += item
+                try: item = self._tx_q.get_nowait()
+                except queue.Empty: break
+            if buf and self.serial_port and self.serial_port.is_open:
+                try: self.serial_port.write(buf)
+                except serial.SerialException as e:
+                    if not self.stop_threads.is_set(): self.post_gui_message("serial_error", f"Serial write error: {e}")
+                    break
+
+    def post_gui_message(self, msg_type, data):
+        """Queues a message for the GUI thread; safe to call from any thread and never blocks on Tk."""
+        self.gui_queue.put((msg_type, data))
+
     def process_gui_queue(self):
+        # Polled from the Tk loop: a worker signalling Tk directly (event_generate, after_idle) is a synchronous
+        # cross-thread Tcl call, which would tie motor command timing to GUI redraws and main-thread stalls
+        drained = False
         try:
             while True:
-                msg_type, data = self.gui_queue.get_nowait()
+                msg_type, data = self.gui_queue.get_nowait(); drained = True
                 if msg_type == "update_label":
-                    data['widget'].configure(text=data['text'])
-                    if 'color' in data: data['widget'].configure(text_color=data['color'])
+                    _configure_changed(data['widget'], text=data['text'], text_color=data.get('color'))
                 elif msg_type == "log_event":
                     self.event_log_textbox.configure(state="normal")
                     self.event_log_textbox.insert("end", data + "\n"); self.event_log_textbox.see("end")
                     self.event_log_textbox.configure(state="disabled")
+                elif msg_type == "pid_ui":
+                    self._show_pid_state(*data)
+                elif msg_type == "serial_error": # A worker lost the port; drop the connection from the GUI thread
+                    self.post_gui_message("log_event", data)
+                    if self.serial_port: self.disconnect()
                 elif msg_type == "update_encoders":
-                    encoder_map = {'E1':'M1', 'E2':'M2', 'E3':'M3', 'E4':'M4', 'E5':'S2', 'E6':'S3'}
-                    encoder_values = [0]*6
-                    for part in data.split('|'):
-                        try:
-                            key, val_str = part.split(':')
-                            if key in self.encoder_labels: self.encoder_labels[key].configure(text=val_str)
-                            encoder_index = int(key[1:]) - 1
-                            encoder_values[encoder_index] = int(val_str)
-                            if (motor := encoder_map.get(key)): self.current_encoders[motor] = int(val_str)
-                        except (ValueError, KeyError, IndexError): continue
+                    self.current_encoders[:] = data
+                    self._pending_enc = data
+                    if not self._enc_scheduled:
+                        self._enc_scheduled = True; self.after_idle(self._apply_encoder_labels)
                     if self.graph_window:
-                        self.graph_window.update_data(encoder_values)
-                elif msg_type == "update_widget_color":
-                    data['widget'].configure(fg_color=data['color'])
-                elif msg_type == "update_joystick_visual":
-                    data['widget'].place(relx=0.5 + data['x']*0.4, rely=0.5 - data['y']*0.4, anchor="center")
+                        self.graph_window.update_data(data)
+                elif msg_type == "batch":
+                    for w, (text, color) in data['labels'].items(): _configure_changed(w, text=text, text_color=color)
+                    for w, color in data['colors'].items(): _configure_changed(w, fg_color=color)
+                    for w, (x, y) in data['places'].items(): _place_changed(w, relx=0.5 + x*0.4, rely=0.5 - y*0.4)
         except queue.Empty: pass
-        finally: self.after(50, self.process_gui_queue)
+        finally: self.after(20 if drained else 50, self.process_gui_queue) # Poll at the controller tick while messages flow
+
+    def _apply_encoder_labels(self):
+        """Shows the latest encoder frame, reconfiguring only the labels whose value changed."""
+        self._enc_scheduled = False
+        values, self._pending_enc = self._pending_enc, None
+        if values is None: return
+        for i, value in enumerate(values.tolist()):
+            _configure_changed(self.encoder_labels[f"E{i+1}"], text=f"{value:d}")
 
     def on_closing(self):
-        self.stop_threads.set()
-        if self.controller_thread: self.controller_thread.join(timeout=1)
-        if self.serial_reader_thread: self.serial_reader_thread.join(timeout=1)
-        if self.serial_port and self.serial_port.is_open: self.serial_port.close()
-        pygame.quit()
+        self._stop_workers()
+        # A controller thread that outlived the join is still inside pygame; the process exit cleans up after it
+        if not (self.controller_thread and self.controller_thread.is_alive()): pygame.quit()
         if self.graph_window: self.graph_window.destroy()
         self.destroy()
 
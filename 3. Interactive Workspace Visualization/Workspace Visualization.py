@@ -28,14 +28,10 @@ max_length_points = {
 
 
 # --- Generate Min Length Data ---
-# This automatically uses the updated max_length_points
-min_length_points = {}
-for name, config in max_length_points.items():
-    min_length_points[name] = {
-        "end_effector": [config["end_effector"][0], config["end_effector"][1] + 10, config["end_effector"][2]],
-        "link1": [config["link1"][0], config["link1"][1] + 10, config["link1"][2]],
-        "base": [config["base"][0], config["base"][1] + 10, config["base"][2]]
-    }
+# Points of every configuration as (base, link 1, end-effector), shape (n_configs, 3, 3)
+MAX_ARR = np.array([[c["base"], c["link1"], c["end_effector"]] for c in max_length_points.values()], dtype=np.float32)
+# Min length shifts every point 10 cm along y; this automatically uses the updated max_length_points
+MIN_ARR = MAX_ARR + np.float32([0, 10, 0])
 
 # --- Setup the Plot ---
 fig = plt.figure(figsize=(15, 10))
@@ -45,38 +41,40 @@ fig.subplots_adjust(left=0.25)
 
 
 # --- Plotting Logic ---
-# Dictionaries to hold the plot artist objects (lines and text) for toggling visibility
+# Dictionaries to hold the text artists for toggling visibility
 plotted_artists = {'Max': {}, 'Min': {}}
-all_end_effectors = []
 
-# Function to plot a single arm configuration and store its artists
-def plot_arm(config, arm_color, length_type, config_name):
-    base, link1, ee = config["base"], config["link1"], config["end_effector"]
-    # The workspace is defined by the end-effector positions
-    all_end_effectors.append(ee)
-    
-    # Plot segments and store the line objects
-    line1, = ax.plot([base[0], link1[0]], [base[1], link1[1]], [base[2], link1[2]], color=arm_color, marker='o', linestyle='-', visible=False)
-    line2, = ax.plot([link1[0], ee[0]], [link1[1], ee[1]], [link1[2], ee[2]], color=arm_color, marker='o', linestyle='-', visible=False)
+# Function to label the points of a single arm configuration
+def label_arm(vertices, length_type, config_name):
+    base, link1, ee = vertices
     
     # Add text labels for each point
     text_base = ax.text(base[0], base[1], base[2], 'Base', color='black', visible=False)
     text_link1 = ax.text(link1[0], link1[1], link1[2], 'Link 1', color='purple', visible=False)
     text_ee = ax.text(ee[0], ee[1], ee[2], 'EE', color='red', visible=False)
 
-    # Store all artists (lines and text) for easy access later
-    plotted_artists[length_type][config_name] = [line1, line2, text_base, text_link1, text_ee]
+    # Store the text artists for easy access later
+    plotted_artists[length_type][config_name] = [text_base, text_link1, text_ee]
+
+# One line artist per length type draws every arm; hidden configurations are simply left out of its data
+arm_lines = {}
+for length_type, arm_points, arm_color in (('Max', MAX_ARR, 'blue'), ('Min', MIN_ARR, 'green')):
+    for name, vertices in zip(max_length_points, arm_points):
+        label_arm(vertices, length_type, name)
+    # Base -> link 1 -> end-effector, then a NaN row that breaks the line before the next arm
+    arm_vertices = np.concatenate([arm_points, np.full((len(arm_points), 1, 3), np.nan, dtype=np.float32)], axis=1)
+    line, = ax.plot([], [], [], color=arm_color, marker='o', linestyle='-')
+    arm_lines[length_type] = (line, arm_vertices) # arm_vertices has shape (n_configs, 4, 3)
 
-# Plot all configurations but keep them invisible initially
-for name, config in max_length_points.items():
-    plot_arm(config, 'blue', 'Max', name)
-for name, config in min_length_points.items():
-    plot_arm(config, 'green', 'Min', name)
+# Every label in one flat list, ordered by length type, then configuration, then point
+all_labels = [text for length_type in ('Max', 'Min') for texts in plotted_artists[length_type].values() for text in texts]
+# Configurations currently shown, as last applied by update_visibility; rows are Max then Min, like arm_lines
+shown_configs = np.zeros((2, len(max_length_points)), dtype=bool)
 
 # --- Plot Workspace (Convex Hull) ---
 # The hull is calculated from ALL end-effector points (min and max length).
 # It represents the reachable volume of the end-effector.
-all_end_effectors = np.array(all_end_effectors)
+all_end_effectors = np.vstack([MAX_ARR[:, 2], MIN_ARR[:, 2]])
 hull = ConvexHull(all_end_effectors)
 # The Poly3DCollection is the object representing the hull surface
 hull_surface = ax.plot_trisurf(
@@ -110,26 +108,27 @@ def update_visibility(label):
     
     show_max = len_visibility[0]
     show_min = len_visibility[1]
-
-    # Iterate through each configuration type (e.g., "Up-Up")
-    for i, config_name in enumerate(config_labels):
-        # Check if this specific configuration should be shown
-        show_config = conf_visibility[i]
-
-        # Set visibility for Max Length artists
-        for artist in plotted_artists['Max'][config_name]:
-            artist.set_visible(show_max and show_config)
-
-        # Set visibility for Min Length artists
-        for artist in plotted_artists['Min'][config_name]:
-            artist.set_visible(show_min and show_config)
+    # Which configurations should be shown for each length type, laid out like shown_configs
+    new_configs = np.array([show_max, show_min])[:, None] & np.array(conf_visibility)[None, :]
+
+    # Refill only the lines whose set of shown arms changed
+    for (line, arm_vertices), configs, changed in zip(arm_lines.values(), new_configs, (new_configs != shown_configs).any(axis=1)):
+        if changed:
+            shown = arm_vertices[configs].reshape(-1, 3)
+            line.set_data_3d(shown[:, 0], shown[:, 1], shown[:, 2])
+
+    # Each configuration has 3 labels, so repeating its flag lines the mask up with all_labels; only flipped labels are touched
+    label_mask, old_mask = np.repeat(new_configs.ravel(), 3), np.repeat(shown_configs.ravel(), 3)
+    for i in np.flatnonzero(label_mask != old_mask):
+        all_labels[i].set_visible(bool(label_mask[i]))
+    shown_configs[:] = new_configs
             
     # Toggle workspace visibility
     workspace_visible = check_ws.get_status()[0]
     hull_surface.set_visible(workspace_visible)
     
-    # Redraw the plot with the new visibility settings
-    plt.draw()
+    # Schedule a redraw with the new visibility settings; rapid clicks coalesce into one paint
+    fig.canvas.draw_idle()
 
 # Connect the widgets to the update function
 check_len.on_clicked(update_visibility)